@@ -1,16 +1,30 @@
 import streamlit as st
 import cv2
-import tempfile
 import os
+import collections
+import functools
 import zipfile
-import io
+import importlib.machinery
+import hashlib
 import imageio
 import numpy as np
+from concurrent.futures.process import BrokenProcessPool
+
+from vevo_core import clamp, new_temp_dir, touch_temp_dir, remove_file, read_file, opencv_has_avx2, pick_mp4_encoders, open_capture, seek, open_video, get_frame, fit_width, draw_boxes, crop_roi, roi_fits, stitch_panes, pipelined, export_crop, submit_exports
+
+# Streamlit runs this script as a stand-in __main__ module whose __file__ is this script, so
+# spawned export workers would re-run the whole app as __mp_main__ before taking any jobs.
+# A __main__ spec tells multiprocessing there is no main module for them to re-import.
+__spec__ = importlib.machinery.ModuleSpec("__main__", None)
 
 # --- Page Configuration ---
 st.set_page_config(page_title="Vevo 2100 Frame Editor", layout="centered")
 st.title("Vevo 2100 Video Editor (Batch)")
 
+if not opencv_has_avx2():
+    st.warning("This OpenCV build lacks AVX2 dispatch, so cropping and export will be 2-3× slower. "
+               "Reinstall the prebuilt opencv-python-headless wheel from PyPI.")
+
 st.markdown("""
 **Instructions:**
 1. **Upload** your videos (GIFs recommended for exact frame syncing).
@@ -28,32 +42,52 @@ uploaded_files = st.file_uploader(
     accept_multiple_files=True
 )
 
-def clamp(val, lo, hi):
-    return max(lo, min(hi, val))
-
 if uploaded_files:
     
     # --- 0. Optimize: Cache Temp Files in Session State ---
-    if 'temp_video_paths' not in st.session_state:
+    # Also start over if the session sat idle long enough for its temp directory to be reaped
+    if 'temp_video_paths' not in st.session_state or not os.path.isdir(st.session_state.temp_dir):
         st.session_state.temp_video_paths = {}
+        st.session_state.temp_video_hashes = {}
+        # Everything this session writes lives in one directory, named by content and settings
+        st.session_state.temp_dir = new_temp_dir()
+        # Decoded preview frames, one LRU shared by all of the session's videos (see get_frame)
+        st.session_state.frame_cache = collections.OrderedDict()
+        # Earlier exports lived in the old directory
+        st.session_state.export_cache = {}
+        st.session_state['processed_zip_path'] = None
+    temp_dir = st.session_state.temp_dir
+    touch_temp_dir(temp_dir)
+    frame_cache = st.session_state.frame_cache
 
     current_file_names = [f.name for f in uploaded_files]
 
     # Cleanup removed files from cache
     for name in list(st.session_state.temp_video_paths.keys()):
         if name not in current_file_names:
-            try: os.unlink(st.session_state.temp_video_paths[name])
-            except: pass
-            del st.session_state.temp_video_paths[name]
+            removed_path = st.session_state.temp_video_paths.pop(name)
+            removed_hash = st.session_state.temp_video_hashes.pop(name)
+            # Identical uploads share one file and cached frames; keep them while another still uses them
+            if removed_path not in st.session_state.temp_video_paths.values():
+                remove_file(removed_path)
+            if removed_hash not in st.session_state.temp_video_hashes.values():
+                for key in [key for key in frame_cache if key[0] == removed_hash]:
+                    del frame_cache[key]
+            # Drop cached decoders so the deleted file's handle is closed
+            open_video.clear()
 
     # Create temp files for newly uploaded files only
     for f in uploaded_files:
         if f.name not in st.session_state.temp_video_paths:
-            tfile = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(f.name)[1])
-            f.seek(0)
-            tfile.write(f.read())
-            tfile.close()
-            st.session_state.temp_video_paths[f.name] = tfile.name
+            # Content hash, so identical videos share one temp file and export results whatever their file name
+            video_hash = hashlib.blake2b(f.getbuffer(), digest_size=16).hexdigest()
+            video_path = os.path.join(temp_dir, f"in_{video_hash}{os.path.splitext(f.name)[1]}")
+            if not os.path.exists(video_path):
+                # Write straight from the upload's in-memory buffer; read() would make another full copy
+                with open(video_path, "wb") as tfile:
+                    tfile.write(f.getbuffer())
+            st.session_state.temp_video_paths[f.name] = video_path
+            st.session_state.temp_video_hashes[f.name] = video_hash
 
     # --- 1. Video Selector & Mapping ---
     file_map = {f.name: f for f in uploaded_files}
@@ -63,7 +97,7 @@ if uploaded_files:
     selected_video_path = st.session_state.temp_video_paths[selected_name]
 
     # --- 2. Read Metadata ---
-    cap = cv2.VideoCapture(selected_video_path)
+    cap, H, W, detected_fps, total_frames = open_video(selected_video_path)
     
     if not cap.isOpened():
         st.error("Error opening video file.")
@@ -71,11 +105,6 @@ if uploaded_files:
         detected_fps = 30.0
         W, H = 640, 480
     else:
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        detected_fps = cap.get(cv2.CAP_PROP_FPS)
-        W = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        H = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
         if total_frames <= 0: total_frames = 100
         if detected_fps <= 0: detected_fps = 30.0
 
@@ -226,16 +255,8 @@ if uploaded_files:
     with c5: rx0 = create_synced_crop("R-Start (%)", "crop_rx0")
     with c6: rx1 = create_synced_crop("R-End (%)", "crop_rx1")
 
-    y_start = int(clamp(y0, 0, 1) * H)
-    y_end   = int(clamp(y1, 0, 1) * H)
-    lx_start = int(clamp(lx0, 0, 1) * W)
-    lx_end   = int(clamp(lx1, 0, 1) * W)
-    rx_start = int(clamp(rx0, 0, 1) * W)
-    rx_end   = int(clamp(rx1, 0, 1) * W)
-
-    if y_end <= y_start: y_end = y_start + 1
-    if lx_end <= lx_start: lx_end = lx_start + 1
-    if rx_end <= rx_start: rx_end = rx_start + 1
+    roi = crop_roi((y0, y1, lx0, lx1, rx0, rx1), W, H)
+    y_start, y_end, lx_start, lx_end, rx_start, rx_end = roi
 
     crop_h = y_end - y_start
     crop_w_left = lx_end - lx_start
@@ -294,46 +315,49 @@ if uploaded_files:
     actual_preview_frame = clamp(preview_frame_display - 1, 0, total_frames - 1)
     
     # Read frame for the single selected video
-    cap.set(cv2.CAP_PROP_POS_FRAMES, actual_preview_frame)
-    ret, frame_preview = cap.read()
+    frame_preview = get_frame(frame_cache, selected_video_path, st.session_state.temp_video_hashes[selected_name], actual_preview_frame)
+    ret = frame_preview is not None
 
     if ret:
         current_time = actual_preview_frame / user_fps
-        overlay = frame_preview.copy()
-        
-        cv2.rectangle(overlay, (lx_start, y_start), (lx_end, y_end), (0, 255, 0), 2)
-        cv2.rectangle(overlay, (rx_start, y_start), (rx_end, y_end), (0, 255, 0), 2)
+
+        # Downscale to display size and convert to RGB only when the previewed frame changes;
+        # crop slider moves reuse it
+        preview_key = (selected_video_path, actual_preview_frame)
+        if st.session_state.get("preview_rgb_key") != preview_key:
+            small, st.session_state.preview_scale = fit_width(frame_preview)
+            st.session_state.preview_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            st.session_state.preview_rgb_key = preview_key
+        preview_rgb = st.session_state.preview_rgb
+        scale = st.session_state.preview_scale
         
-        st.image(
-            cv2.cvtColor(overlay, cv2.COLOR_BGR2RGB), 
-            use_container_width=True, 
-            caption=f"Frame: {preview_frame_display} | Vevo Time: {current_time:.3f}s"
-        )
+        # Draw the crop boxes on the cached frame and undo them once st.image has encoded it
+        restore_preview = draw_boxes(preview_rgb, [
+            ((round(lx_start * scale), round(y_start * scale)), (round(lx_end * scale), round(y_end * scale))),
+            ((round(rx_start * scale), round(y_start * scale)), (round(rx_end * scale), round(y_end * scale))),
+        ])
+        try:
+            st.image(
+                preview_rgb, 
+                use_container_width=True, 
+                caption=f"Frame: {preview_frame_display} | Vevo Time: {current_time:.3f}s"
+            )
+        finally:
+            restore_preview()
         
         col_btn1, col_btn2 = st.columns(2)
         
         with col_btn1:
             if st.button("▶️ Play 1s Clip"):
                 with st.spinner("Rendering preview clip..."):
-                    t_prev = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    preview_writer = cv2.VideoWriter(t_prev.name, fourcc, user_fps, (final_w, crop_h))
+                    prev_path = os.path.join(temp_dir, "preview.mp4")
                     frames_to_render = int(user_fps) 
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, actual_preview_frame)
-                    
-                    for _ in range(frames_to_render):
-                        ret_p, frame_p = cap.read()
-                        if not ret_p: break
-                        
-                        crop_left = frame_p[y_start:y_end, lx_start:lx_end]
-                        crop_right = frame_p[y_start:y_end, rx_start:rx_end]
-                        
-                        if crop_left.shape[0] > 0 and crop_right.shape[0] > 0:
-                            stitched_frame = cv2.hconcat([crop_left, crop_right])
-                            preview_writer.write(stitched_frame)
-                            
-                    preview_writer.release()
-                    st.video(t_prev.name)
+                    clip_end = min(actual_preview_frame + frames_to_render, total_frames) - 1
+                    export_crop(selected_video_path, prev_path, roi, (actual_preview_frame, clip_end), user_fps,
+                                encoders=pick_mp4_encoders())
+                    # st.video loads the file into Streamlit's media store, so the clip can go right away
+                    st.video(prev_path)
+                    remove_file(prev_path)
                     
         with col_btn2:
             crop_left_clean = frame_preview[y_start:y_end, lx_start:lx_end]
@@ -357,14 +381,10 @@ if uploaded_files:
         # --- Grid Preview of Current Frame ---
         st.markdown("### Grid Preview at Current Frame")
         if ordered_files:
-            caps_grid = []
-            for fname in ordered_files:
-                path = st.session_state.temp_video_paths[fname]
-                cap_obj = cv2.VideoCapture(path)
-                cap_obj.set(cv2.CAP_PROP_POS_FRAMES, actual_preview_frame)
-                caps_grid.append(cap_obj)
-
-            num_vids = len(caps_grid)
+            grid_paths = [st.session_state.temp_video_paths[fname] for fname in ordered_files]
+            grid_hashes = [st.session_state.temp_video_hashes[fname] for fname in ordered_files]
+
+            num_vids = len(grid_paths)
             rows = (num_vids + grid_cols - 1) // grid_cols
             row_images = []
             
@@ -373,8 +393,10 @@ if uploaded_files:
                 for c in range(grid_cols):
                     idx = r * grid_cols + c
                     if idx < num_vids:
-                        ok, frame = caps_grid[idx].read()
-                        if ok and frame.shape[0] >= y_end and frame.shape[1] >= max(lx_end, rx_end):
+                        # Single frames per tile: prefetching blocks for every grid video would hold
+                        # PREFETCH_FRAMES full frames each
+                        frame = get_frame(frame_cache, grid_paths[idx], grid_hashes[idx], actual_preview_frame, prefetch=False)
+                        if frame is not None and roi_fits(frame.shape, roi):
                             cl = frame[y_start:y_end, lx_start:lx_end]
                             cr = frame[y_start:y_end, rx_start:rx_end]
                             if cl.shape[0] > 0 and cr.shape[0] > 0:
@@ -391,8 +413,9 @@ if uploaded_files:
             
             if row_images:
                 full_grid_frame = cv2.vconcat(row_images)
+                # Shrink before converting; the PNG download below keeps full resolution
                 st.image(
-                    cv2.cvtColor(full_grid_frame, cv2.COLOR_BGR2RGB), 
+                    cv2.cvtColor(fit_width(full_grid_frame)[0], cv2.COLOR_BGR2RGB), 
                     use_container_width=True, 
                     caption=f"Overlapped Grid Preview (Frame {preview_frame_display})"
                 )
@@ -406,16 +429,11 @@ if uploaded_files:
                         file_name=f"grid_preview_frame_{preview_frame_display}.png",
                         mime="image/png"
                     )
-            
-            for cap_obj in caps_grid:
-                cap_obj.release()
         else:
             st.info("No videos selected in the 'Arrange video sequence' options to form a grid.")
 
     else:
         st.warning("Could not read frame.")
-    
-    cap.release()
 
     st.markdown("---")
 
@@ -424,68 +442,83 @@ if uploaded_files:
     col_process_zip, col_process_grid = st.columns(2)
 
     # --- OPTION A: Original ZIP Logic ---
-    if 'processed_zip' not in st.session_state:
-        st.session_state['processed_zip'] = None
+    if 'processed_zip_path' not in st.session_state:
+        st.session_state['processed_zip_path'] = None
 
     with col_process_zip:
         if st.button(f"📦 Export to ZIP\n({len(uploaded_files)} videos as {export_format})"):
             progress_bar = st.progress(0.0)
             status_text = st.empty()
-            zip_buffer = io.BytesIO()
+            # Build the archive on disk rather than in a BytesIO. Streamlit still loads it into
+            # memory to serve it, but only once the download button is clicked.
+            if st.session_state['processed_zip_path'] is not None:
+                remove_file(st.session_state['processed_zip_path'])
+                st.session_state['processed_zip_path'] = None
+            zip_path = os.path.join(temp_dir, "export.zip")
+            # Pick the encoders here and pass them in. The workers are separate processes that
+            # don't share this cache, so any ffmpeg probe they need is re-run in each of them.
+            mp4_encoders = pick_mp4_encoders()
             
-            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-                for i, uploaded_file in enumerate(uploaded_files):
-                    status_text.text(f"Zipping {uploaded_file.name}...")
-                    
-                    t_in_name = st.session_state.temp_video_paths[uploaded_file.name]
-
-                    vcap = cv2.VideoCapture(t_in_name)
-                    vcap.set(cv2.CAP_PROP_POS_FRAMES, actual_start)
+            # Each video is independent, so encode them concurrently in the worker processes
+            # and add the finished files to the ZIP in upload order.
+            # Encodes are keyed by content hash + settings: duplicate uploads in the batch are
+            # encoded once, and unchanged videos reuse the previous export's output.
+            if 'export_cache' not in st.session_state:
+                st.session_state.export_cache = {}
+            prev_cache = st.session_state.export_cache
+            run_cache = {}
+            ext = ".mp4" if export_format == "MP4" else ".gif"
+            
+            # MP4 and GIF are already compressed, so deflating them again only burns CPU
+            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as zipf:
+                entries = []
+                jobs = {}
+                for uploaded_file in uploaded_files:
                     base_name = os.path.splitext(uploaded_file.name)[0]
-                    
-                    ext = ".mp4" if export_format == "MP4" else ".gif"
                     out_name = f"{base_name}_frames_{start_display}-{end_display}{ext}"
-                    
-                    t_out = tempfile.NamedTemporaryFile(delete=False, suffix=ext)
-                    t_out_name = t_out.name
-                    t_out.close()
-                    
-                    if export_format == "MP4":
-                        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                        writer = cv2.VideoWriter(t_out_name, fourcc, user_fps, (final_w, crop_h))
-                    else:
-                        writer = imageio.get_writer(t_out_name, mode='I', fps=user_fps, loop=0)
-                    
-                    for _ in range(actual_start, actual_end + 1):
-                        ok, frame = vcap.read()
-                        if not ok: break
-                        
-                        if frame.shape[0] >= y_end and frame.shape[1] >= max(lx_end, rx_end):
-                            crop_left = frame[y_start:y_end, lx_start:lx_end]
-                            crop_right = frame[y_start:y_end, rx_start:rx_end]
-                            
-                            if crop_left.shape[0] > 0 and crop_right.shape[0] > 0:
-                                stitched_frame = cv2.hconcat([crop_left, crop_right])
-                                
-                                if export_format == "MP4":
-                                    writer.write(stitched_frame)
-                                else:
-                                    rgb_frame = cv2.cvtColor(stitched_frame, cv2.COLOR_BGR2RGB)
-                                    writer.append_data(rgb_frame)
-                    
-                    vcap.release()
-                    
-                    if export_format == "MP4": writer.release()
-                    else: writer.close()
-                        
-                    zipf.write(t_out_name, arcname=out_name)
-                    try: os.unlink(t_out_name)
-                    except: pass
-                    progress_bar.progress((i + 1) / len(uploaded_files))
+                    key = (st.session_state.temp_video_hashes[uploaded_file.name], roi,
+                           actual_start, actual_end, user_fps, export_format)
+                    entries.append((uploaded_file.name, key, out_name))
+                    if key in run_cache:
+                        continue
+                    # Output names are derived from the key, so an entry whose file went missing
+                    # is re-encoded to the same path and must not be treated as stale below
+                    cached_path = prev_cache.pop(key, None)
+                    if cached_path is not None and os.path.exists(cached_path):
+                        run_cache[key] = cached_path
+                        continue
+
+                    key_digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+                    out_path = os.path.join(temp_dir, f"out_{key_digest}{ext}")
+                    run_cache[key] = out_path
+                    t_in_name = st.session_state.temp_video_paths[uploaded_file.name]
+                    jobs[key] = (t_in_name, out_path, roi, (actual_start, actual_end),
+                                 user_fps, export_format, mp4_encoders)
+                futures = submit_exports(jobs)
+
+                for i, (name, key, out_name) in enumerate(entries):
+                    status_text.text(f"Zipping {name}...")
+                    if key in futures:
+                        try:
+                            futures[key].result()
+                        except BrokenProcessPool:
+                            # A worker died mid-batch and took the pool with it; rerun everything
+                            # it left unfinished, once, on a fresh pool
+                            futures.update(submit_exports({
+                                k: jobs[k] for k, f in futures.items()
+                                if isinstance(f.exception(), BrokenProcessPool)
+                            }))
+                            futures[key].result()
+                    zipf.write(run_cache[key], arcname=out_name)
+                    progress_bar.progress((i + 1) / len(entries))
+
+            # Only this run's outputs stay cached
+            for stale_path in prev_cache.values():
+                remove_file(stale_path)
+            st.session_state.export_cache = run_cache
 
             status_text.success("✅ ZIP Complete!")
-            zip_buffer.seek(0)
-            st.session_state['processed_zip'] = zip_buffer.getvalue()
+            st.session_state['processed_zip_path'] = zip_path
 
     # --- OPTION B: Merged Grid Logic ---
     if 'merged_grid_gif' not in st.session_state:
@@ -501,55 +534,62 @@ if uploaded_files:
                     
                     for fname in ordered_files:
                         path = st.session_state.temp_video_paths[fname]
-                        cap_obj = cv2.VideoCapture(path)
-                        cap_obj.set(cv2.CAP_PROP_POS_FRAMES, actual_start)
+                        cap_obj = open_capture(path)
+                        seek(cap_obj, actual_start)
                         caps.append(cap_obj)
 
                     num_vids = len(caps)
                     rows = (num_vids + grid_cols - 1) // grid_cols
+                    # One reusable decode buffer per video
+                    bufs = [
+                        np.empty((int(c.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(c.get(cv2.CAP_PROP_FRAME_WIDTH)), 3), dtype=np.uint8)
+                        for c in caps
+                    ]
                     
-                    t_grid_out = tempfile.NamedTemporaryFile(delete=False, suffix=".gif")
-                    grid_writer = imageio.get_writer(t_grid_out.name, mode='I', fps=user_fps, loop=0)
+                    grid_out_path = os.path.join(temp_dir, "grid.gif")
+                    grid_writer = imageio.get_writer(grid_out_path, mode='I', fps=user_fps, loop=0)
 
                     progress_bar_grid = st.progress(0.0)
                     total_frames_to_process = actual_end - actual_start + 1
+                    # Every progress update is a websocket message, so refresh ~50 times per export, not per frame
+                    progress_every = max(1, total_frames_to_process // 50)
+
+                    # The ROI and layout are fixed for the whole export, so stitch each video straight
+                    # into its own tile of a preallocated grid canvas. Empty slots stay black.
+                    def tile_views(canvas):
+                        return [
+                            canvas[(idx // grid_cols) * crop_h:(idx // grid_cols + 1) * crop_h,
+                                   (idx % grid_cols) * final_w:(idx % grid_cols + 1) * final_w]
+                            for idx in range(num_vids)
+                        ]
+
+                    # Videos too small for the ROI stay black; checked once, not per frame
+                    fits = [roi_fits(b.shape, roi) for b in bufs]
+
+                    def fill_grid(canvas):
+                        for idx, tile in enumerate(tile_views(canvas)):
+                            ok, frame = caps[idx].read(bufs[idx])
+                            if ok and fits[idx]:
+                                stitch_panes(frame, roi, tile)
+                            else:
+                                tile.fill(0)
+                        return True
 
-                    for step, f_idx in enumerate(range(actual_start, actual_end + 1)):
-                        row_images = []
-                        for r in range(rows):
-                            cols_in_row = []
-                            for c in range(grid_cols):
-                                idx = r * grid_cols + c
-                                if idx < num_vids:
-                                    ok, frame = caps[idx].read()
-                                    if ok and frame.shape[0] >= y_end and frame.shape[1] >= max(lx_end, rx_end):
-                                        cl = frame[y_start:y_end, lx_start:lx_end]
-                                        cr = frame[y_start:y_end, rx_start:rx_end]
-                                        if cl.shape[0] > 0 and cr.shape[0] > 0:
-                                            stitched = cv2.hconcat([cl, cr])
-                                            cols_in_row.append(stitched)
-                                        else:
-                                            cols_in_row.append(np.zeros((crop_h, final_w, 3), dtype=np.uint8))
-                                    else:
-                                        cols_in_row.append(np.zeros((crop_h, final_w, 3), dtype=np.uint8))
-                                else:
-                                    cols_in_row.append(np.zeros((crop_h, final_w, 3), dtype=np.uint8))
-                            
-                            row_images.append(cv2.hconcat(cols_in_row))
-                        
-                        full_grid_frame = cv2.vconcat(row_images)
-                        rgb_grid_frame = cv2.cvtColor(full_grid_frame, cv2.COLOR_BGR2RGB)
+                    # Decode and stitch on a background thread while this one encodes the GIF
+                    grid_shape = (rows * crop_h, grid_cols * final_w, 3)
+                    for step, grid_canvas in enumerate(pipelined(fill_grid, total_frames_to_process, grid_shape)):
+                        rgb_grid_frame = cv2.cvtColor(grid_canvas, cv2.COLOR_BGR2RGB)
                         grid_writer.append_data(rgb_grid_frame)
                         
-                        progress_bar_grid.progress((step + 1) / total_frames_to_process)
+                        if (step + 1) % progress_every == 0 or step + 1 == total_frames_to_process:
+                            progress_bar_grid.progress((step + 1) / total_frames_to_process)
 
                     grid_writer.close()
                     for cap_obj in caps: cap_obj.release()
 
-                    with open(t_grid_out.name, "rb") as f:
+                    with open(grid_out_path, "rb") as f:
                         st.session_state['merged_grid_gif'] = f.read()
-                    try: os.unlink(t_grid_out.name)
-                    except: pass
+                    remove_file(grid_out_path)
 
                     st.success("✅ Overlapped Grid Complete!")
 
@@ -558,10 +598,11 @@ if uploaded_files:
     col_dl1, col_dl2 = st.columns(2)
     
     with col_dl1:
-        if st.session_state['processed_zip'] is not None:
+        if st.session_state['processed_zip_path'] is not None:
+            # Deferred: the archive is only read when the button is clicked, not on every rerun
             st.download_button(
                 label="⬇️ Download ZIP",
-                data=st.session_state['processed_zip'],
+                data=functools.partial(read_file, st.session_state['processed_zip_path']),
                 file_name="vevo_processed_videos.zip",
                 mime="application/zip"
             )
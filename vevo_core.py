@@ -0,0 +1,583 @@
+"""Shared decode, crop and export helpers for the Vevo 2100 editor."""
+import atexit
+import concurrent.futures
+import concurrent.futures.process
+import multiprocessing
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import cv2
+import imageio
+import numpy as np
+import streamlit as st
+
+# Keep OpenCV's SIMD paths on, and leave half the cores to Streamlit and the ffmpeg
+# encoders since the export pool already runs several videos at once
+cv2.setUseOptimized(True)
+cv2.setNumThreads(max(1, (os.cpu_count() or 2) // 2))
+
+# False on x86 OpenCV builds that neither compile AVX2 into the baseline nor dispatch AVX2
+# kernels for cvtColor/copies
+@st.cache_resource
+def opencv_has_avx2():
+    if platform.machine().lower() not in ("x86_64", "amd64"):
+        return True
+    for line in cv2.getBuildInformation().splitlines():
+        name, _, features = line.partition(":")
+        if name.strip() in ("Baseline", "Dispatched code generation") and "AVX2" in features.split():
+            return True
+    return False
+
+def clamp(val, lo, hi):
+    return max(lo, min(hi, val))
+
+# Per-session temp directories holding uploads and exports under deterministic names.
+# Streamlit has no session-end hook, so live sessions touch theirs on every rerun and any
+# left untouched for TEMP_DIR_TTL seconds (ended sessions, or a killed server's leftovers)
+# are reaped whenever a new one is created. The rest are removed when the server exits.
+TEMP_DIR_PREFIX = "vevo2100_"
+TEMP_DIR_TTL = 6 * 3600
+_temp_dirs = []
+
+def new_temp_dir():
+    cutoff = time.time() - TEMP_DIR_TTL
+    for entry in os.scandir(tempfile.gettempdir()):
+        try:
+            if (entry.name.startswith(TEMP_DIR_PREFIX) and entry.is_dir(follow_symlinks=False)
+                    and entry.stat(follow_symlinks=False).st_mtime < cutoff):
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+    path = tempfile.mkdtemp(prefix=TEMP_DIR_PREFIX)
+    _temp_dirs.append(path)
+    return path
+
+# Mark a session's temp directory as in use, so new_temp_dir doesn't reap it
+def touch_temp_dir(path):
+    os.utime(path)
+
+@atexit.register
+def _remove_temp_dirs():
+    for path in _temp_dirs:
+        shutil.rmtree(path, ignore_errors=True)
+
+# Delete a file if it exists
+def remove_file(path):
+    try: os.unlink(path)
+    except FileNotFoundError: pass
+
+# Contents of a file, closing it before returning
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+# Output of an ffmpeg capability listing (empty when ffmpeg is not installed)
+def ffmpeg_query(flag):
+    if shutil.which("ffmpeg") is None:
+        return ""
+    try:
+        return subprocess.run(["ffmpeg", "-hide_banner", flag], capture_output=True, text=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+# Video codecs offered by the local ffmpeg build
+def ffmpeg_codecs(flag):
+    out = ffmpeg_query(flag)
+    return {line.split()[1] for line in out.splitlines() if line.startswith(" V") and len(line.split()) > 1}
+
+@st.cache_resource
+def ffmpeg_encoders():
+    return ffmpeg_codecs("-encoders")
+
+@st.cache_resource
+def ffmpeg_decoders():
+    return ffmpeg_codecs("-decoders")
+
+# Hardware decode methods the build was compiled with, e.g. {"cuda", "vaapi"}
+@st.cache_resource
+def ffmpeg_hwaccels():
+    lines = ffmpeg_query("-hwaccels").splitlines()
+    return {line.strip() for line in lines[1:] if line.strip()}
+
+# True if ffmpeg can actually open a CUDA device. Distro builds list cuda in -hwaccels on
+# hosts without an NVIDIA GPU, where any -hwaccel cuda command fails outright.
+@st.cache_resource
+def cuda_decode_available():
+    if "cuda" not in ffmpeg_hwaccels():
+        return False
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-init_hw_device", "cuda",
+        "-f", "lavfi", "-i", "nullsrc=s=64x64", "-frames:v", "1", "-f", "null", "-"
+    ]
+    try:
+        return subprocess.run(cmd, capture_output=True, timeout=30).returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+# NVDEC decoders by container FOURCC; these accept a crop window applied inside the decoder
+CUVID_DECODERS = {
+    "avc1": "h264_cuvid", "h264": "h264_cuvid", "x264": "h264_cuvid",
+    "hev1": "hevc_cuvid", "hvc1": "hevc_cuvid", "hevc": "hevc_cuvid",
+    "mp4v": "mpeg4_cuvid", "fmp4": "mpeg4_cuvid", "xvid": "mpeg4_cuvid", "divx": "mpeg4_cuvid",
+}
+
+# Stream properties ffmpeg needs before decoding: (codec FOURCC, W, H, fps)
+def probe_video(in_path):
+    cap = cv2.VideoCapture(in_path)
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+    W = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    H = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fourcc.to_bytes(4, "little").decode("ascii", errors="ignore").lower(), W, H, fps
+
+# Ask NVDEC to emit only the bounding box around both panes, so the decoder never
+# post-processes pixels that are thrown away. Returns the extra decoder arguments
+# and the (x, y) origin of the decoded window.
+def cuvid_crop_args(codec, W, H, roi):
+    y_start, y_end, lx_start, lx_end, rx_start, rx_end = roi
+    decoder = CUVID_DECODERS.get(codec)
+    if decoder not in ffmpeg_decoders() or W <= 0 or H <= 0:
+        return [], 0, 0
+
+    # NVDEC crops on even boundaries, so round the window outwards
+    left = min(lx_start, rx_start) & ~1
+    top = y_start & ~1
+    right = max(0, W - max(lx_end, rx_end)) & ~1
+    bottom = max(0, H - y_end) & ~1
+    return ["-c:v", decoder, "-crop", f"{top}x{bottom}x{left}x{right}"], left, top
+
+VAAPI_DEVICE = "/dev/dri/renderD128"
+
+# H.264 encoders for MP4 export in order of preference, hardware first. Each entry is
+# (ffmpeg args before the input, filter ending the graph, encoder args).
+MP4_ENCODERS = {
+    "h264_nvenc": ([], "format=yuv420p", ["-c:v", "h264_nvenc", "-preset", "p4"]),
+    "h264_videotoolbox": ([], "format=yuv420p", ["-c:v", "h264_videotoolbox"]),
+    "h264_vaapi": (["-vaapi_device", VAAPI_DEVICE], "format=nv12,hwupload", ["-c:v", "h264_vaapi"]),
+    "libx264": ([], "format=yuv420p", ["-c:v", "libx264", "-preset", "ultrafast"]),
+}
+
+# Put the moov atom first so browsers (st.video) can start playback before the whole file loads
+MP4_MUX_ARGS = ["-movflags", "+faststart"]
+
+# True if ffmpeg can open `encoder` and encode a frame with it. Hardware encoders are listed
+# whenever ffmpeg was built with them, even without a usable GPU or driver, so each one is
+# tried once per server on a blank frame rather than failing on every exported video.
+@st.cache_resource
+def mp4_encoder_works(encoder):
+    enc_input_args, enc_filter, enc_args = MP4_ENCODERS[encoder]
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", *enc_input_args,
+        "-f", "lavfi", "-i", "nullsrc=s=256x256", "-frames:v", "1",
+        "-vf", enc_filter, *enc_args, "-f", "null", "-"
+    ]
+    try:
+        return subprocess.run(cmd, capture_output=True, timeout=30).returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+# H.264 encoders the local ffmpeg offers and can open, fastest first; empty to encode with
+# OpenCV. Callers still try them in turn, in case one rejects a particular video.
+def pick_mp4_encoders():
+    available = ffmpeg_encoders()
+    return tuple(enc for enc in MP4_ENCODERS if enc in available
+                 and (enc != "h264_vaapi" or os.path.exists(VAAPI_DEVICE))
+                 and mp4_encoder_works(enc))
+
+# Trim, crop both panes and stitch them side by side in a single ffmpeg pass, so no
+# frame ever passes through Python. Decoding runs on NVDEC whenever a CUDA device works,
+# independently of which encoder is used, and is retried in software if NVDEC rejects the
+# stream. Returns False if ffmpeg fails so the caller can fall back to the OpenCV loop.
+def crop_video_ffmpeg(in_path, out_path, start, end, roi, fps, encoder):
+    y_start, y_end, lx_start, lx_end, rx_start, rx_end = roi
+    h = y_end - y_start
+    enc_input_args, enc_filter, enc_args = MP4_ENCODERS[encoder]
+    codec, W, H, src_fps = probe_video(in_path)
+    # Seek the demuxer to the trim start instead of decoding and discarding every earlier
+    # frame. Aim half a frame early so rounding can't skip frame `start`; ffmpeg's accurate
+    # seek then drops the frames before it, and -frames:v stops after the trim end.
+    # GIF frame delays can vary within a file, so there a frame index doesn't map to a seek
+    # time and the graph trims by index instead, decoding from the first frame.
+    if start == 0:
+        seek_args, trim = [], ""
+    elif codec.strip() == "gif" or src_fps <= 0:
+        seek_args, trim = [], f"trim=start_frame={start},"
+    else:
+        seek_args, trim = ["-ss", f"{(start - 0.5) / src_fps:.6f}"], ""
+
+    # (ox, oy) is the origin of the window the decoder emits
+    def run(dec_args, ox, oy):
+        if lx_end == rx_start:
+            # Adjacent panes are one rectangle; crop it directly instead of split + hstack
+            graph = (
+                f"[0:v]{trim}setpts=N/({fps}*TB),"
+                f"crop={rx_end - lx_start}:{h}:{lx_start - ox}:{y_start - oy}:exact=1,"
+                f"crop=trunc(iw/2)*2:trunc(ih/2)*2,{enc_filter}"
+            )
+        else:
+            graph = (
+                f"[0:v]{trim}setpts=N/({fps}*TB),split=2[l][r];"
+                f"[l]crop={lx_end - lx_start}:{h}:{lx_start - ox}:{y_start - oy}:exact=1[lc];"
+                f"[r]crop={rx_end - rx_start}:{h}:{rx_start - ox}:{y_start - oy}:exact=1[rc];"
+                f"[lc][rc]hstack=inputs=2,crop=trunc(iw/2)*2:trunc(ih/2)*2,{enc_filter}"
+            )
+        cmd = [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            *enc_input_args, *dec_args, *seek_args, "-i", in_path,
+            "-filter_complex", graph, "-frames:v", str(end - start + 1),
+            *enc_args, "-r", str(fps), "-an", *MP4_MUX_ARGS, out_path
+        ]
+        try:
+            return subprocess.run(cmd, capture_output=True).returncode == 0
+        except OSError:
+            return False
+
+    if cuda_decode_available():
+        dec_args, ox, oy = cuvid_crop_args(codec, W, H, roi)
+        if run(["-hwaccel", "cuda", *dec_args], ox, oy):
+            return True
+    return run([], 0, 0)
+
+# Pipes frames into an ffmpeg libx264 encoder. Mirrors the parts of the cv2.VideoWriter
+# interface used here, so it can stand in when OpenCV lacks H.264. Frames are converted
+# to I420 with OpenCV while the cropped tile is still in cache, so ffmpeg receives the
+# encoder's native format and skips its own BGR -> YUV pass.
+class FFmpegPipeWriter:
+    def __init__(self, path, fps, size):
+        # I420 needs even dimensions; an odd last row/column is dropped
+        self.w, self.h = size[0] & ~1, size[1] & ~1
+        cmd = [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "yuv420p", "-s", f"{self.w}x{self.h}", "-r", str(fps), "-i", "-",
+            "-c:v", "libx264", "-preset", "ultrafast", "-tune", "fastdecode", "-bf", "0",
+            "-pix_fmt", "yuv420p", "-an", *MP4_MUX_ARGS, path
+        ]
+        self.path = path
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def isOpened(self):
+        return self.proc.poll() is None
+
+    # Frames written after ffmpeg has died are dropped; release() reports the failure
+    def write(self, frame):
+        if self.proc.stdin.closed:
+            return
+        yuv = cv2.cvtColor(frame[:self.h, :self.w], cv2.COLOR_BGR2YUV_I420)
+        try:
+            self.proc.stdin.write(yuv.data)
+        except BrokenPipeError:
+            self.proc.stdin.close()
+
+    # Raises RuntimeError if ffmpeg failed, in which case the file at path is incomplete or missing
+    def release(self):
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.proc.wait()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with status {returncode} while encoding {self.path}")
+
+# Let OpenCV's FFmpeg backend pick a hardware decoder/encoder (NVDEC, VAAPI, D3D11, ...)
+# when the host has one; it falls back to software otherwise
+HW_CAPTURE_PARAMS = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+HW_WRITER_PARAMS = [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+
+# VideoCapture on the FFmpeg backend with hardware decoding allowed, or OpenCV's
+# default backend choice if FFmpeg can't open the file
+def open_capture(path):
+    cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, HW_CAPTURE_PARAMS)
+    if cap.isOpened():
+        return cap
+    cap.release()
+    return cv2.VideoCapture(path)
+
+# OpenCV writer declared as 3-channel colour, matching the contiguous BGR buffers that
+# stitch_panes fills, so write() takes them as-is
+def open_cv_writer(path, fourcc, fps, size):
+    params = [cv2.VIDEOWRITER_PROP_IS_COLOR, 1, *HW_WRITER_PARAMS]
+    return cv2.VideoWriter(path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*fourcc), fps, size, params)
+
+# H.264 MP4 writer: an ffmpeg libx264 pipe (ultrafast, one encoder process for the whole
+# clip) if ffmpeg has it, otherwise open_cv_mp4_writer
+def open_mp4_writer(path, fps, size):
+    if "libx264" in ffmpeg_encoders():
+        return FFmpegPipeWriter(path, fps, size)
+    return open_cv_mp4_writer(path, fps, size)
+
+# OpenCV's avc1 encoder if the build has one, otherwise its MPEG-4 Part 2 (mp4v) encoder
+def open_cv_mp4_writer(path, fps, size):
+    writer = open_cv_writer(path, 'avc1', fps, size)
+    if writer.isOpened():
+        return writer
+    writer.release()
+    return open_cv_writer(path, 'mp4v', fps, size)
+
+# Forward jumps up to this many frames are decoded through instead of seeking
+SEEK_READ_AHEAD = 60
+
+# Move cap to frame idx. A CAP_PROP_POS_FRAMES seek walks back to the previous keyframe
+# and decodes forward, so skip it when the decoder is already positioned there
+# (fresh captures at frame 0, or a read continuing where the last one stopped), and
+# for short forward jumps just grab() the frames in between, which skips colour conversion.
+def seek(cap, idx):
+    pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if pos == idx:
+        return
+    if pos < idx <= pos + SEEK_READ_AHEAD:
+        while pos < idx and cap.grab():
+            pos += 1
+        if pos == idx:
+            return
+    cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+
+# Keep one decoder open per video across reruns instead of reopening it on every widget event.
+# Returns (cap, H, W, fps, total_frames); the metadata is 0 when the file can't be opened.
+# Bounded so decoders (and file handles) of ended sessions are eventually released; an
+# evicted video is simply reopened on its next use.
+@st.cache_resource(max_entries=32, ttl=3600)
+def open_video(path):
+    cap = open_capture(path)
+    if not cap.isOpened():
+        return cap, 0, 0, 0.0, 0
+    return (
+        cap,
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        cap.get(cv2.CAP_PROP_FPS),
+        int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+    )
+
+PREFETCH_FRAMES = 16
+# Decoded bytes a session's frame cache may hold across all videos (a 1080p frame is ~6 MB).
+# Fits the selected video's block plus a single frame for each of a few dozen grid tiles.
+FRAME_CACHE_BYTES = 256 * 2**20
+
+# Decode up to count frames from start in one sequential pass; marked read-only since they are cached
+def read_frames(path, start, count):
+    cap = open_video(path)[0]
+    seek(cap, start)
+    frames = []
+    for _ in range(count):
+        ok, frame = cap.read()
+        if not ok: break
+        frame.flags.writeable = False
+        frames.append(frame)
+    return frames
+
+# Decoded BGR frame at idx (0-based) of the video at path with content hash video_hash,
+# or None if it could not be read. cache is the session's LRU of decoded runs keyed by
+# (video_hash, start, count), bounded by FRAME_CACHE_BYTES across all videos. With prefetch,
+# an aligned block of PREFETCH_FRAMES frames is decoded so scrubbing to neighbouring frames is
+# served from memory; without it (grid tiles) only the frame itself is kept.
+def get_frame(cache, path, video_hash, idx, prefetch=True):
+    block_key = (video_hash, idx - idx % PREFETCH_FRAMES, PREFETCH_FRAMES)
+    key = block_key if prefetch or block_key in cache else (video_hash, idx, 1)
+    if key in cache:
+        cache.move_to_end(key)
+    else:
+        cache[key] = read_frames(path, *key[1:])
+        # The run just read is always kept, even if it alone is over budget
+        size = sum(frame.nbytes for frames in cache.values() for frame in frames)
+        while size > FRAME_CACHE_BYTES and len(cache) > 1:
+            size -= sum(frame.nbytes for frame in cache.popitem(last=False)[1])
+    frames = cache[key]
+    offset = idx - key[1]
+    return frames[offset] if offset < len(frames) else None
+
+# Widest image sent to st.image. The centered layout is ~700 CSS px wide, so this stays
+# sharp on 2x displays while 1080p+ frames aren't PNG-encoded and shipped at full size.
+PREVIEW_MAX_WIDTH = 1280
+
+# img shrunk to at most max_w pixels wide (area-averaged), plus the scale factor applied
+def fit_width(img, max_w=PREVIEW_MAX_WIDTH):
+    if img.shape[1] <= max_w:
+        return img, 1.0
+    scale = max_w / img.shape[1]
+    return cv2.resize(img, (max_w, max(1, round(img.shape[0] * scale))), interpolation=cv2.INTER_AREA), scale
+
+# Draw rectangles ((x0, y0), (x1, y1)) on img in place and return a function that puts back
+# the pixels under the lines. Showing an overlay then touches a few thin strips instead of
+# copying the whole frame on every rerun.
+def draw_boxes(img, boxes, color=(0, 255, 0), thickness=2):
+    H, W = img.shape[:2]
+    pad = thickness
+    saved = []
+    for (x0, y0), (x1, y1) in boxes:
+        ya, yb = max(0, y0 - pad), min(H, y1 + pad + 1)
+        xa, xb = max(0, x0 - pad), min(W, x1 + pad + 1)
+        for strip in (
+            (slice(ya, min(H, y0 + pad + 1)), slice(xa, xb)),  # top edge
+            (slice(max(0, y1 - pad), yb), slice(xa, xb)),      # bottom edge
+            (slice(ya, yb), slice(xa, min(W, x0 + pad + 1))),  # left edge
+            (slice(ya, yb), slice(max(0, x1 - pad), xb)),      # right edge
+        ):
+            saved.append((strip, img[strip].copy()))
+
+    for p0, p1 in boxes:
+        cv2.rectangle(img, p0, p1, color, thickness)
+
+    def restore():
+        for strip, pixels in saved:
+            img[strip] = pixels
+    return restore
+
+# Pixel ROI (y_start, y_end, lx_start, lx_end, rx_start, rx_end) from crop fractions
+# (y0, y1, lx0, lx1, rx0, rx1), clipped to the frame in one vectorised pass. Every span
+# is at least one pixel.
+def crop_roi(fractions, W, H):
+    y_start, y_end, lx_start, lx_end, rx_start, rx_end = (
+        np.clip(fractions, 0, 1) * np.array([H, H, W, W, W, W])).astype(np.int64).tolist()
+    return (y_start, max(y_end, y_start + 1), lx_start, max(lx_end, lx_start + 1),
+            rx_start, max(rx_end, rx_start + 1))
+
+# True if both panes of roi lie inside a frame of this shape
+def roi_fits(shape, roi):
+    y_start, y_end, lx_start, lx_end, rx_start, rx_end = roi
+    return shape[0] >= y_end and shape[1] >= max(lx_end, rx_end)
+
+# Copy the left and right panes of frame side by side into out, a contiguous
+# crop_h x final_w x 3 buffer allocated once per loop (no per-frame hconcat allocation)
+def stitch_panes(frame, roi, out):
+    y_start, y_end, lx_start, lx_end, rx_start, rx_end = roi
+    if lx_end == rx_start:
+        # Adjacent panes are a single column range (whole rows for a full-width crop),
+        # copied in one pass
+        np.copyto(out, frame[y_start:y_end, lx_start:rx_end])
+        return out
+    split = lx_end - lx_start
+    np.copyto(out[:, :split], frame[y_start:y_end, lx_start:lx_end])
+    np.copyto(out[:, split:], frame[y_start:y_end, rx_start:rx_end])
+    return out
+
+PIPELINE_DEPTH = 16
+
+# Run fill(out) for up to count frames on a background thread while the caller consumes
+# them, so decoding overlaps encoding (OpenCV and the encoders release the GIL).
+# fill writes one frame into the preallocated buffer `out` and returns False once the
+# source is exhausted. Buffers come from a ring two larger than the queue, so a yielded
+# frame stays untouched until the caller asks for the next one.
+def pipelined(fill, count, shape):
+    ring = [np.zeros(shape, dtype=np.uint8) for _ in range(PIPELINE_DEPTH + 2)]
+    frames = queue.Queue(maxsize=PIPELINE_DEPTH)
+    stop = threading.Event()
+    errors = []
+
+    def produce():
+        try:
+            for i in range(count):
+                out = ring[i % len(ring)]
+                if stop.is_set() or not fill(out):
+                    break
+                frames.put(out)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            frames.put(None)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            out = frames.get()
+            if out is None:
+                break
+            yield out
+    finally:
+        # Unblock the producer if the consumer stopped early
+        stop.set()
+        while worker.is_alive():
+            try: frames.get(timeout=0.1)
+            except queue.Empty: pass
+    if errors:
+        raise errors[0]
+
+# Trim to frame_range (inclusive, 0-based), crop and stitch one video into out_path as MP4 or GIF
+# MP4 exports run as a single ffmpeg pass with the first of encoders (see pick_mp4_encoders)
+# that works, and fall back to the OpenCV loop if none does.
+def export_crop(in_path, out_path, roi, frame_range, fps, export_format="MP4", encoders=()):
+    start, end = frame_range
+    y_start, y_end, lx_start, lx_end, rx_start, rx_end = roi
+    crop_h = y_end - y_start
+    final_w = (lx_end - lx_start) + (rx_end - rx_start)
+
+    # The ffmpeg graph rounds the output down to even dimensions, which is empty for a 1 px crop
+    if export_format == "MP4" and min(crop_h, final_w) >= 2:
+        for encoder in encoders:
+            if crop_video_ffmpeg(in_path, out_path, start, end, roi, fps, encoder):
+                return
+
+    # Neither I420 nor OpenCV's mp4v writer accepts a 1 px dimension, so MP4 frames are
+    # padded with black up to 2 px; the stitched crop goes in the top-left corner
+    if export_format == "MP4":
+        out_h, out_w = max(crop_h, 2), max(final_w, 2)
+    else:
+        out_h, out_w = crop_h, final_w
+
+    def encode(write):
+        vcap = open_capture(in_path)
+        seek(vcap, start)
+        # Decode every frame into the same buffer instead of allocating a new array per read
+        buf = np.empty((int(vcap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(vcap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3), dtype=np.uint8)
+
+        def fill(out):
+            ok, frame = vcap.read(buf)
+            if not ok:
+                return False
+            stitch_panes(frame, roi, out[:crop_h, :final_w])
+            return True
+
+        # Frame size is fixed for the whole stream, so check the ROI once; a video too small
+        # for it yields no frames
+        count = end - start + 1 if roi_fits(buf.shape, roi) else 0
+        for stitched_frame in pipelined(fill, count, (out_h, out_w, 3)):
+            write(stitched_frame)
+        vcap.release()
+
+    if export_format == "MP4":
+        writer = open_mp4_writer(out_path, fps, (out_w, out_h))
+        encode(writer.write)
+        try:
+            writer.release()
+        except RuntimeError:
+            # The ffmpeg pipe encoder died (its stderr is in the server log); encode the clip
+            # again with OpenCV's own writer rather than ship a truncated file
+            writer = open_cv_mp4_writer(out_path, fps, (out_w, out_h))
+            encode(writer.write)
+            writer.release()
+    else:
+        writer = imageio.get_writer(out_path, mode='I', fps=fps, loop=0)
+        encode(lambda stitched_frame: writer.append_data(cv2.cvtColor(stitched_frame, cv2.COLOR_BGR2RGB)))
+        writer.close()
+
+# Each worker runs one video at a time and the pool keeps every core busy, so OpenCV's own
+# thread pool would only oversubscribe the CPU
+def init_export_worker():
+    cv2.setNumThreads(1)
+
+# Worker processes for batch exports, kept alive across reruns and sessions so the interpreter
+# and OpenCV start-up is paid once. Processes rather than threads, because GIF quantisation in
+# Pillow holds the GIL. Spawned rather than forked so workers don't inherit Streamlit's threads.
+# A pool whose worker died (e.g. OOM-killed) is broken for good, so it is replaced on next use.
+@st.cache_resource(validate=lambda pool: not pool._broken)
+def export_pool():
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_export_worker)
+
+# Submit export_crop for each job (key -> export_crop args) and return key -> future. Retried
+# once if the pool breaks while the jobs are being queued.
+def submit_exports(jobs):
+    try:
+        pool = export_pool()
+        return {key: pool.submit(export_crop, *args) for key, args in jobs.items()}
+    except concurrent.futures.process.BrokenProcessPool:
+        pool = export_pool()
+        return {key: pool.submit(export_crop, *args) for key, args in jobs.items()}